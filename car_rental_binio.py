@@ -5,15 +5,22 @@ CarRent-BinIO (clean)
 - 3 ไฟล์ไบนารี customers.bin / cars.bin / contracts.bin
 - fixed-length records + struct (endianness '<') + header 128B + index 16B/slot
 - index แบบ open addressing + free-list + soft delete (flag=0)
+  (โหลด index ขึ้น dict ตอน open -> lookup O(1) ในหน่วยความจำ, เขียนกลับ slot บนดิสก์ทุกครั้ง)
+- อ่าน/เขียนผ่าน mmap ทั้งไฟล์ (ไม่ seek+read ทีละ slot/ระเบียน)
+- durability: 'none' | 'batch' (ค่าเริ่มต้น: fsync ตอน checkpoint/close) | 'full' (fsync ทุกครั้ง)
 - เมนู CRUD/VIEW/REPORT (ไม่มี seed_demo — ใช้สคริปต์ seed แยก)
 
 เข้ากันได้กับ seed_sample_data.py (ฟอร์แมต identical)
 """
 from __future__ import annotations
+import io
 import os
 import sys
+import mmap
 import struct
 import argparse
+from collections import Counter
+from functools import lru_cache
 from dataclasses import dataclass
 from datetime import datetime, date
 from typing import Optional, Iterable, Tuple, Dict, Any
@@ -27,31 +34,57 @@ INDEX_SLOT_SIZE = 16
 HEADER_FMT = E + '4s B B H I I I I I i I 92x'   # 128B
 INDEX_FMT  = E + 'I I 8x'                        # 16B
 TOMBSTONE_KEY = 0xFFFFFFFF                       # ทำ tombstone ตอนลบ index slot
+OPEN_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)   # fd ดิบ ไม่มี buffer ของ Python
 # Record format
 CUST_FMT = E + 'B I 13s 50s 10s I B 45x'; CUST_SIZE=128; CUST_PAD=83
 CARS_FMT = E + 'B I 12s 12s 16s H I I B I 68x'; CARS_SIZE=128; CARS_PAD=60
 CONT_FMT = E + 'B I I I I I I B 38x';           CONT_SIZE=64;  CONT_PAD=26
-
-CAR_STATUS = {0:'available', 1:'rented', 2:'maintenance', 3:'retired'}
-CAR_STATUS_REV = {v:k for k,v in CAR_STATUS.items()}
+# compile ฟอร์แมตครั้งเดียว (ไม่ต้อง parse format string ทุกครั้งที่ pack/unpack)
+HEADER_S, INDEX_S, CUST_S, CARS_S, CONT_S = map(struct.Struct, (HEADER_FMT, INDEX_FMT, CUST_FMT, CARS_FMT, CONT_FMT))
+# offset ของ status/updated_at ในระเบียนรถ (เปลี่ยนสถานะได้โดยไม่ต้อง pack ใหม่ทั้งระเบียน)
+CARS_OFF_STATUS = struct.calcsize(E + 'B I 12s 12s 16s H I I'); CARS_OFF_UPDATED = CARS_OFF_STATUS + 1
+# offset ของชื่อในระเบียนลูกค้า (รายการสัญญา/รายงานอ่านแค่ชื่อ ไม่ต้อง unpack ทั้งระเบียน)
+CUST_OFF_NAME = struct.calcsize(E + 'B I 13s'); CUST_NAME_LEN = 50
+INT32_S = struct.Struct(E + 'i')                   # free-list next pointer (อยู่ใน padding ของระเบียน)
+UINT32_S = struct.Struct(E + 'I')
+# offset ของฟิลด์ที่เปลี่ยนบ่อยใน header (คำนวณจาก HEADER_FMT) ใช้ pack_into ทีละฟิลด์
+_HDR_CODES = HEADER_FMT[len(E):].split()
+OFF_UPDATED_AT, OFF_NEXT_ID, OFF_ACTIVE, OFF_DELETED, OFF_FREE_HEAD = (
+    struct.calcsize(E + ' '.join(_HDR_CODES[:k])) for k in range(5, 10))
+
+DURABILITY = ('none', 'batch', 'full')             # นโยบาย fsync
+
+CAR_STATUS = ('available', 'rented', 'maintenance', 'retired')   # index = รหัสสถานะ 0..3
+CAR_STATUS_REV = {v:k for k,v in enumerate(CAR_STATUS)}
+# prefix -> [codes] (avai/ren/main/ret ...) ใช้กรองสถานะด้วย dict lookup ครั้งเดียว
+CAR_STATUS_PREFIX = {label[:i]: [c for c, l in enumerate(CAR_STATUS) if l.startswith(label[:i])]
+                     for label in CAR_STATUS for i in range(1, len(label)+1)}
 
 # ----------------------------
 # ยูทิลิตี้
 # ----------------------------
 now_ts = lambda: int(datetime.now().timestamp())
 
-def fit(s: str, n: int) -> bytes:
-    return (s or '').encode('utf-8','ignore')[:n].ljust(n, b'\x00')
+def fit(s: str, n: int, _pad: bytes = b'\x00') -> bytes:
+    b = s.encode('utf-8','ignore') if s else b''
+    if len(b) >= n: return b[:n]
+    return b + _pad*(n-len(b))
 
 def ymd_to_int(s: str) -> int:
     if not s: return 0
-    y,m,d = map(int, s.split('-'))
+    if len(s) == 10 and s[4] == '-' and s[7] == '-':   # 'YYYY-MM-DD' -> slice ตรง ๆ ไม่ต้อง split
+        return int(s[0:4])*10000 + int(s[5:7])*100 + int(s[8:10])
+    y,m,d = map(int, s.split('-'))                     # รูปแบบไม่เติมศูนย์ เช่น 2025-1-5
     return y*10000 + m*100 + d
 
+@lru_cache(maxsize=4096)   # วันที่ซ้ำกันมากในรายการสัญญา -> format ครั้งเดียวต่อค่า
 def int_to_ymd(n: int) -> str:
     if not n: return '-'
-    y=n//10000; m=(n//100)%100; d=n%100
-    return f"{y:04d}-{m:02d}-{d:02d}"
+    y, rem = divmod(n, 10000); m, d = divmod(rem, 100)
+    return f"{y:04}-{m:02}-{d:02}"
+
+def _dec(b: bytes) -> str:
+    return b.rstrip(b'\x00').decode('utf-8','ignore')
 
 def ensure_dir(p: str) -> None:
     if p and not os.path.isdir(p): os.makedirs(p, exist_ok=True)
@@ -65,13 +98,13 @@ class Header:
     created_at: int; updated_at: int; next_id: int
     active_count: int; deleted_count: int; free_head: int; index_slots: int
     def pack(self) -> bytes:
-        return struct.pack(HEADER_FMT, self.magic, self.version, self.endian,
-                           self.record_size, self.created_at, self.updated_at,
-                           self.next_id, self.active_count, self.deleted_count,
-                           self.free_head, self.index_slots)
+        return HEADER_S.pack(self.magic, self.version, self.endian,
+                             self.record_size, self.created_at, self.updated_at,
+                             self.next_id, self.active_count, self.deleted_count,
+                             self.free_head, self.index_slots)
     @classmethod
     def unpack(cls, b: bytes) -> 'Header':
-        (magic, ver, ed, rsz, c_at, u_at, nid, ac, dc, fh, slots) = struct.unpack(HEADER_FMT, b)
+        (magic, ver, ed, rsz, c_at, u_at, nid, ac, dc, fh, slots) = HEADER_S.unpack(b)
         return cls(magic,ver,ed,rsz,c_at,u_at,nid,ac,dc,fh,slots)
     @classmethod
     def new(cls, magic: bytes, record_size: int, index_slots: int) -> 'Header':
@@ -80,189 +113,266 @@ class Header:
 @dataclass
 class IndexSlot:
     key: int; rec_index: int
-    def pack(self) -> bytes: return struct.pack(INDEX_FMT, self.key, self.rec_index)
-    @classmethod
-    def unpack(cls, b: bytes) -> 'IndexSlot':
-        k,ri = struct.unpack(INDEX_FMT, b); return cls(k,ri)
+    def pack(self) -> bytes: return INDEX_S.pack(self.key, self.rec_index)
 
 # ----------------------------
 # ชั้นตารางไบนารี (ทั่วไป)
 # ----------------------------
 class BinTable:
-    def __init__(self, path: str, magic: bytes, rsize: int, rfmt: str, slots: int, pad_off: int):
-        self.path=path; self.magic=magic; self.rsize=rsize; self.rfmt=rfmt
-        self.slots=slots; self.pad_off=pad_off
-        self.f=None; self.h: Optional[Header]=None
+    def __init__(self, path: str, magic: bytes, rsize: int, rstruct: struct.Struct, slots: int, pad_off: int,
+                 durability: str = 'batch'):
+        if durability not in DURABILITY: raise ValueError(f'bad durability: {durability}')
+        self.path=path; self.magic=magic; self.rsize=rsize; self.rstruct=rstruct
+        self.slots=slots; self.pad_off=pad_off; self.durability=durability
+        self.fd: Optional[int]=None; self.mm: Optional[mmap.mmap]=None; self.h: Optional[Header]=None
+        self._dirty_header = False        # มีการแก้ไขที่ยังไม่ได้ประทับ updated_at
+        self._rec_count = 0               # จำนวนระเบียนในไฟล์ (รวมที่ลบ) — นับจากขนาดไฟล์ตอน open
+        self._idx: Dict[int,int] = {}     # key -> rec_index
+        self._slot: Dict[int,int] = {}    # key -> ตำแหน่ง slot บนดิสก์ (ใช้ตอนทำ tombstone)
+        self._can_resize = True           # mmap.resize ใช้ได้ (Linux/Windows); macOS ไม่มี mremap -> remap เอง
 
     # --- file lifecycle ---
     def open(self) -> None:
         new = not os.path.exists(self.path)
-        self.f = open(self.path, 'w+b' if new else 'r+b')
+        self.fd = os.open(self.path, OPEN_FLAGS, 0o644)
         if new:
             self.h = Header.new(self.magic, self.rsize, self.slots)
-            self.f.seek(0); self.f.write(self.h.pack())
-            for _ in range(self.slots): self.f.write(IndexSlot(0,0).pack())
-            self._sync()
-        else:
-            self.f.seek(0); self.h = Header.unpack(self.f.read(HEADER_SIZE))
+            os.write(self.fd, self.h.pack() + IndexSlot(0,0).pack()*self.slots)
+        # map ทั้งไฟล์ (header+index+records) -> อ่าน/เขียนด้วย slice ไม่ต้อง seek
+        self.mm = mmap.mmap(self.fd, 0)
+        if not new:
+            self.h = Header.unpack(self.mm[:HEADER_SIZE])
             if self.h.magic != self.magic or self.h.record_size != self.rsize:
                 raise RuntimeError(f"bad file format for {self.path}")
+        payload = len(self.mm) - self._records_region_ofs()
+        self._rec_count = 0 if payload <= 0 else payload // self.rsize
+        self._load_index()
 
     def close(self) -> None:
-        if self.f: self.f.flush(); os.fsync(self.f.fileno()); self.f.close(); self.f=None
+        if self.mm: self.checkpoint(); self.mm.close(); self.mm=None
+        if self.fd is not None: os.close(self.fd); self.fd=None
 
-    def _sync(self) -> None:
-        self.f.flush(); os.fsync(self.f.fileno())
+    def checkpoint(self) -> None:
+        """บังคับลงดิสก์ (msync+fsync) — เรียกตอน close หรือหลังธุรกรรมสำคัญ"""
+        self.flush_header()
+        if self.durability == 'none': return
+        self.mm.flush(); os.fsync(self.fd)
 
-    def _write_header(self) -> None:
-        self.h.updated_at = now_ts(); self.f.seek(0); self.f.write(self.h.pack()); self._sync()
+    def _sync(self) -> None:
+        """หลังแก้ไขแต่ละครั้ง: fsync เฉพาะโหมด 'full' (โหมด batch รอ checkpoint)"""
+        if self.durability == 'full': self.checkpoint()
+
+    def _grow(self, size: int) -> None:
+        """ขยายไฟล์+mapping ให้ยาว size ไบต์
+        ใช้ mmap.resize ถ้าระบบรองรับ ไม่งั้น ftruncate แล้ว map ใหม่ (macOS ไม่มี mremap -> SystemError)"""
+        if size <= len(self.mm): return
+        if self._can_resize:
+            try: self.mm.resize(size); return
+            except SystemError: self._can_resize = False
+        self.mm.close(); os.ftruncate(self.fd, size); self.mm = mmap.mmap(self.fd, 0)
+
+    def flush_header(self) -> None:
+        """ประทับ updated_at ครั้งเดียวหลังชุดการแก้ไข (ตัวนับถูกเขียนทีละฟิลด์ไปแล้ว)"""
+        if not self._dirty_header: return
+        self.h.updated_at = now_ts(); UINT32_S.pack_into(self.mm, OFF_UPDATED_AT, self.h.updated_at)
+        self._dirty_header = False
+
+    def _hdr_store(self, ofs: int, s: struct.Struct, value: int) -> None:
+        """เขียนเฉพาะฟิลด์ที่เปลี่ยนลง header บน mapping แทนการ pack ใหม่ทั้ง 128 ไบต์"""
+        s.pack_into(self.mm, ofs, value); self._dirty_header = True
 
     # --- index helpers ---
     def _index_ofs(self, slot: int) -> int: 
         return HEADER_SIZE + slot*INDEX_SLOT_SIZE
-    def _read_slot(self, slot: int) -> IndexSlot:
-        self.f.seek(self._index_ofs(slot)); 
-        return IndexSlot.unpack(self.f.read(INDEX_SLOT_SIZE))
     def _write_slot(self, slot: int, slotval: IndexSlot) -> None:
-        self.f.seek(self._index_ofs(slot)); self.f.write(slotval.pack())
-    def _hash(self, key: int) -> int: 
-        return key % self.h.index_slots
+        o = self._index_ofs(slot); self.mm[o:o+INDEX_SLOT_SIZE] = slotval.pack()
+
+    def _load_index(self) -> None:
+        """อ่าน index region ครั้งเดียวแล้วสร้าง dict (ข้าม slot ว่าง/tombstone)"""
+        self._idx.clear(); self._slot.clear()
+        region = self.mm[HEADER_SIZE:self._records_region_ofs()]
+        for j, (k, ri) in enumerate(INDEX_S.iter_unpack(region)):
+            if k != 0 and k != TOMBSTONE_KEY:
+                self._idx[k] = ri; self._slot[k] = j
 
     def _find_slot_for_insert(self, key: int) -> int:
         """หา slot สำหรับ insert (reuse tombstone ถ้ามี)"""
-        start = self._hash(key); first_tomb = -1
-        for i in range(self.h.index_slots):
-            j = (start + i) % self.h.index_slots
-            sl = self._read_slot(j)
-            if sl.key == key:
-                raise ValueError('duplicate key')
-            if sl.key == TOMBSTONE_KEY and first_tomb < 0:
+        if key in self._idx:
+            raise ValueError('duplicate key')
+        # ผูก local ไว้ก่อนวน (ไม่ต้องค้น attribute/สร้าง IndexSlot ทุก probe)
+        slots = self.h.index_slots; mm = self.mm; unpack = INDEX_S.unpack_from
+        start = key % slots; first_tomb = -1
+        for i in range(slots):
+            j = (start + i) % slots
+            k = unpack(mm, HEADER_SIZE + j*INDEX_SLOT_SIZE)[0]
+            if k == TOMBSTONE_KEY and first_tomb < 0:
                 first_tomb = j
-            if sl.key == 0:   # ว่างจริง
+            if k == 0:   # ว่างจริง
                 return first_tomb if first_tomb >= 0 else j
+        # ไม่มี slot ว่างเหลือ แต่ tombstone ยังใช้ซ้ำได้ (dict เป็นตัวจริง ไม่ต้องรักษา probe chain ของ key ที่ลบ)
+        if first_tomb >= 0: return first_tomb
         raise RuntimeError('index full')
 
     def _lookup(self, key: int) -> Optional[int]:
-        start = self._hash(key)
-        for i in range(self.h.index_slots):
-            j = (start + i) % self.h.index_slots
-            sl = self._read_slot(j)
-            if sl.key == 0:   # เจอว่างจริง -> ไม่มีในตาราง
-                return None
-            if sl.key == key:
-                return sl.rec_index
-        return None
+        return self._idx.get(key)
 
     def _slot_of_key(self, key: int) -> Optional[int]:
-        start = self._hash(key)
-        for i in range(self.h.index_slots):
-            j = (start + i) % self.h.index_slots
-            sl = self._read_slot(j)
-            if sl.key == 0: return None
-        return None
+        return self._slot.get(key)
 
     # --- record space ---
     def _records_region_ofs(self) -> int: return HEADER_SIZE + self.h.index_slots*INDEX_SLOT_SIZE
     def _record_ofs(self, rec_index: int) -> int: return self._records_region_ofs() + rec_index*self.rsize
     def _records_count(self) -> int:
-        self.f.seek(0, os.SEEK_END)
-        payload = self.f.tell() - self._records_region_ofs()
-        return 0 if payload <= 0 else payload // self.rsize
+        return self._rec_count
     def _read_raw(self, rec_index: int) -> bytes:
-        self.f.seek(self._record_ofs(rec_index)); return self.f.read(self.rsize)
+        o = self._record_ofs(rec_index); return self.mm[o:o+self.rsize]
     def _write_raw(self, rec_index: int, data: bytes) -> None:
         assert len(data) == self.rsize
-        self.f.seek(self._record_ofs(rec_index)); self.f.write(data)
+        o = self._record_ofs(rec_index); self.mm[o:o+self.rsize] = data
     def _write_next_free(self, rec_index: int, next_free: int) -> None:
-        self.f.seek(self._record_ofs(rec_index)+self.pad_off); self.f.write(struct.pack(E+'i', next_free))
+        INT32_S.pack_into(self.mm, self._record_ofs(rec_index)+self.pad_off, next_free)
 
     # --- CRUD ขั้นต่ำ ---
     def next_id(self) -> int:
-        nid = self.h.next_id; self.h.next_id += 1; self._write_header(); return nid
+        nid = self.h.next_id; self.h.next_id += 1
+        self._hdr_store(OFF_NEXT_ID, UINT32_S, self.h.next_id); return nid
 
     def _alloc_rec_index(self) -> int:
         if self.h.free_head != -1:
             i = self.h.free_head
-            self.f.seek(self._record_ofs(i) + self.pad_off)
-            nxt = struct.unpack(E+'i', self.f.read(4))[0]
-            self.h.free_head = nxt
+            self.h.free_head = INT32_S.unpack_from(self.mm, self._record_ofs(i) + self.pad_off)[0]
+            self._hdr_store(OFF_FREE_HEAD, INT32_S, self.h.free_head)
             return i
-        return self._records_count()
+        # ต่อท้ายไฟล์: ขยาย mapping ก่อนเขียนระเบียนใหม่
+        i = self._rec_count; self._grow(self._record_ofs(i+1)); self._rec_count += 1
+        return i
 
     def add_record(self, key: int, packed: bytes) -> int:
-        i = self._alloc_rec_index(); self._write_raw(i, packed)
-        j = self._find_slot_for_insert(key); self._write_slot(j, IndexSlot(key, i))
-        self.h.active_count += 1; self._write_header(); self._sync(); return i
+        j = self._find_slot_for_insert(key)   # หา slot ก่อน: index เต็ม -> ยังไม่เขียน/ไม่แตะ free-list
+        i = self._alloc_rec_index(); self._write_raw(i, packed); self._write_slot(j, IndexSlot(key, i))
+        self._idx[key] = i; self._slot[key] = j
+        self.h.active_count += 1; self._hdr_store(OFF_ACTIVE, UINT32_S, self.h.active_count)
+        self._sync(); return i
+
+    def bulk_add(self, items: Iterable[Tuple[int, bytes]]) -> int:
+        """เพิ่มหลายระเบียนต่อท้ายไฟล์ในครั้งเดียว (ไม่ใช้ free-list)
+        เขียน records ทั้งก้อนด้วย slice เดียว + header ครั้งเดียว คืน rec_index ตัวแรก"""
+        items = list(items)
+        keys = [k for k,_ in items]
+        if len(set(keys)) != len(keys) or any(k in self._idx for k in keys):
+            raise ValueError('duplicate key')
+        # slot ที่ไม่มี key ค้างอยู่ (ว่าง/tombstone) ใช้ได้ทั้งหมด -> เช็กนี้ตรงพอดี ตรวจก่อนเขียนอะไรลงไฟล์
+        if len(self._idx) + len(keys) > self.h.index_slots: raise RuntimeError('index full')
+        start = self._rec_count
+        if not items: return start
+        body = b''.join(p for _,p in items)
+        assert len(body) == len(items)*self.rsize
+        o = self._record_ofs(start); self._grow(o + len(body)); self.mm[o:o+len(body)] = body
+        self._rec_count += len(items)
+        for ri, key in enumerate(keys, start):
+            j = self._find_slot_for_insert(key); self._write_slot(j, IndexSlot(key, ri))
+            self._idx[key] = ri; self._slot[key] = j
+        self.h.active_count += len(items); self._hdr_store(OFF_ACTIVE, UINT32_S, self.h.active_count)
+        self._sync(); return start
 
     def read_record(self, key: int) -> Optional[bytes]:
-        ri = self._lookup(key); return None if ri is None else self._read_raw(ri)
+        ri = self._idx.get(key); return None if ri is None else self._read_raw(ri)
+
+    def read_with_index(self, key: int) -> Optional[Tuple[int, bytes]]:
+        """เหมือน read_record แต่คืน (rec_index, raw) ไว้ส่งต่อให้ update_at โดยไม่ต้อง lookup ซ้ำ"""
+        ri = self._idx.get(key); return None if ri is None else (ri, self._read_raw(ri))
+
+    def update_at(self, rec_index: int, packed: bytes) -> None:
+        self._write_raw(rec_index, packed); self._dirty_header = True; self._sync()
 
     def update_record(self, key: int, packed: bytes) -> None:
         ri = self._lookup(key)
         if ri is None: raise KeyError('not found')
-        self._write_raw(ri, packed); self._write_header(); self._sync()
+        self.update_at(ri, packed)
 
     def delete_record(self, key: int) -> None:
         ri = self._lookup(key)
         if ri is None: raise KeyError('not found')
         # mark record inactive (flag=0)
-        rec = bytearray(self._read_raw(ri)); rec[0] = 0; self._write_raw(ri, bytes(rec))
+        self.mm[self._record_ofs(ri)] = 0
         # push rec index to free-list
         self._write_next_free(ri, self.h.free_head); self.h.free_head = ri
+        self._hdr_store(OFF_FREE_HEAD, INT32_S, ri)
         # tombstone index slot
         sj = self._slot_of_key(key)
         if sj is not None:
             self._write_slot(sj, IndexSlot(TOMBSTONE_KEY, 0))
+        del self._idx[key]; self._slot.pop(key, None)
         # header counters
-        self.h.active_count -= 1; self.h.deleted_count += 1; self._write_header(); self._sync()
+        self.h.active_count -= 1; self.h.deleted_count += 1
+        self._hdr_store(OFF_ACTIVE, UINT32_S, self.h.active_count)
+        self._hdr_store(OFF_DELETED, UINT32_S, self.h.deleted_count); self._sync()
 
     # --- iterators ---
-    def iter_active(self) -> Iterable[Tuple[int, bytes]]:
-        for i in range(self._records_count()):
-            raw = self._read_raw(i)
-            if raw and raw[0] == 1: yield i, raw
-    def iter_all(self) -> Iterable[Tuple[int, bytes]]:
-        for i in range(self._records_count()):
-            raw = self._read_raw(i)
-            if raw: yield i, raw
+    def _records_region(self) -> bytes:
+        o = self._records_region_ofs(); return self.mm[o:o + self._records_count()*self.rsize]
+    def scan_all(self) -> Iterable[Tuple[int, tuple]]:
+        """สแกน records ทั้งก้อนด้วย iter_unpack (คืน tuple ดิบ ไม่สร้าง dict)"""
+        return enumerate(self.rstruct.iter_unpack(self._records_region()))
+    def scan_active(self) -> Iterable[Tuple[int, tuple]]:
+        for i, t in self.scan_all():
+            if t[0] == 1: yield i, t
 
 # ----------------------------
 # ตารางเฉพาะ
 # ----------------------------
 class Customers(BinTable):
-    def __init__(self, path: str, slots: int = 1024):
-        super().__init__(path, b'CUST', CUST_SIZE, CUST_FMT, slots, CUST_PAD)
+    def __init__(self, path: str, slots: int = 1024, durability: str = 'batch'):
+        super().__init__(path, b'CUST', CUST_SIZE, CUST_S, slots, CUST_PAD, durability)
     def pack(self, flag:int, cid:int, id_card:str, name:str, phone:str, birth_ymd:int, gender:int) -> bytes:
-        return struct.pack(self.rfmt, flag, cid, fit(id_card,13), fit(name,50), fit(phone,10), birth_ymd, gender)
+        return self.rstruct.pack(flag, cid, fit(id_card,13), fit(name,50), fit(phone,10), birth_ymd, gender)
     def unpack(self, raw: bytes) -> Dict[str,Any]:
-        f,cid,idc,nam,ph,birth,gen = struct.unpack(E+'B I 13s 50s 10s I B 45x', raw)
-        dec=lambda b:b.rstrip(b'\x00').decode('utf-8','ignore')
-        return {'flag':f,'cus_id':cid,'id_card':dec(idc),'name':dec(nam),'phone':dec(ph),'birth_ymd':birth,'gender':gen}
+        f,cid,idc,nam,ph,birth,gen = self.rstruct.unpack(raw)
+        return {'flag':f,'cus_id':cid,'id_card':_dec(idc),'name':_dec(nam),'phone':_dec(ph),'birth_ymd':birth,'gender':gen}
+    def name_of(self, cid: int) -> Optional[str]:
+        ri = self._idx.get(cid)
+        if ri is None: return None
+        o = self._record_ofs(ri) + CUST_OFF_NAME; return _dec(self.mm[o:o+CUST_NAME_LEN])
 
 class Cars(BinTable):
-    def __init__(self, path: str, slots: int = 1024):
-        super().__init__(path, b'CARS', CARS_SIZE, CARS_FMT, slots, CARS_PAD)
+    def __init__(self, path: str, slots: int = 1024, durability: str = 'batch'):
+        super().__init__(path, b'CARS', CARS_SIZE, CARS_S, slots, CARS_PAD, durability)
     def pack(self, flag:int, car_id:int, plate:str, brand:str, model:str, year:int, rate_cents:int, odo_km:int, status:int, updated_at:int) -> bytes:
-        return struct.pack(self.rfmt, flag, car_id, fit(plate,12), fit(brand,12), fit(model,16), year, rate_cents, odo_km, status, updated_at)
+        return self.rstruct.pack(flag, car_id, fit(plate,12), fit(brand,12), fit(model,16), year, rate_cents, odo_km, status, updated_at)
     def unpack(self, raw: bytes) -> Dict[str,Any]:
-        f,car_id,pl,br,md,yr,rt,odo,st,up = struct.unpack(E+'B I 12s 12s 16s H I I B I 68x', raw)
-        dec=lambda b:b.rstrip(b'\x00').decode('utf-8','ignore')
-        return {'flag':f,'car_id':car_id,'license':dec(pl),'brand':dec(br),'model':dec(md),'year':yr,'rate_cents':rt,'odometer_km':odo,'status':st,'updated_at':up}
+        f,car_id,pl,br,md,yr,rt,odo,st,up = self.rstruct.unpack(raw)
+        return {'flag':f,'car_id':car_id,'license':_dec(pl),'brand':_dec(br),'model':_dec(md),'year':yr,'rate_cents':rt,'odometer_km':odo,'status':st,'updated_at':up}
+    def update_status_at(self, rec_index: int, status: int, updated_at: int) -> None:
+        o = self._record_ofs(rec_index)
+        self.mm[o + CARS_OFF_STATUS] = status; UINT32_S.pack_into(self.mm, o + CARS_OFF_UPDATED, updated_at)
+        self._dirty_header = True; self._sync()
 
 class Contracts(BinTable):
-    def __init__(self, path: str, slots: int = 2048):
-        super().__init__(path, b'CONT', CONT_SIZE, CONT_FMT, slots, CONT_PAD)
+    def __init__(self, path: str, slots: int = 2048, durability: str = 'batch'):
+        super().__init__(path, b'CONT', CONT_SIZE, CONT_S, slots, CONT_PAD, durability)
+        self.open_by_car: Dict[int,int] = {}    # car_id -> rent_id ของสัญญาที่ยังไม่คืน (App ดูแลตอนเขียน)
+    def open(self) -> None:
+        super().open()
+        self.open_by_car.clear(); latest: Dict[int,int] = {}
+        for _, (_, rid, _, car_id, rent, _, _, returned) in self.scan_active():
+            if returned == 0 and (car_id not in latest or rent > latest[car_id]):
+                latest[car_id] = rent; self.open_by_car[car_id] = rid
+    def delete_record(self, key: int) -> None:
+        super().delete_record(key)
+        for car_id in [c for c, rid in self.open_by_car.items() if rid == key]:
+            del self.open_by_car[car_id]
     def pack(self, flag:int, rid:int, cus_id:int, car_id:int, rent:int, ret:int, total:int, returned:int) -> bytes:
-        return struct.pack(self.rfmt, flag, rid, cus_id, car_id, rent, ret, total, returned)
+        return self.rstruct.pack(flag, rid, cus_id, car_id, rent, ret, total, returned)
     def unpack(self, raw: bytes) -> Dict[str,Any]:
-        f,rid,cus,car,rent,ret,tot,returned = struct.unpack(E+'B I I I I I I B 38x', raw)
+        f,rid,cus,car,rent,ret,tot,returned = self.rstruct.unpack(raw)
         return {'flag':f,'rent_id':rid,'cus_id':cus,'car_id':car,'rent_ymd':rent,'return_ymd':ret,'total_cents':tot,'returned':returned}
 
 # ----------------------------
 # ตรวจสอบอินพุต
 # ----------------------------
-is_idcard = lambda s: s.isdigit() and len(s) == 13
-is_phone  = lambda s: s.isdigit() and 9 <= len(s) <= 10
+_NON_DIGITS = str.maketrans('', '', '0123456789')   # ลบเลข 0-9 ออก เหลือว่าง = เป็นตัวเลขล้วน
+is_idcard = lambda s: len(s) == 13 and not s.translate(_NON_DIGITS)
+is_phone  = lambda s: 9 <= len(s) <= 10 and not s.translate(_NON_DIGITS)
 is_plate  = lambda s: 0 < len(s.strip()) <= 16
 is_year   = lambda y: 1900 <= y <= datetime.now().year + 1
 
@@ -270,15 +380,19 @@ is_year   = lambda y: 1900 <= y <= datetime.now().year + 1
 # แอปรายการคำสั่ง (CLI)
 # ----------------------------
 class App:
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: str, durability: str = 'batch'):
         ensure_dir(data_dir)
-        self.customers = Customers(os.path.join(data_dir, 'customers.bin'))
-        self.cars      = Cars(     os.path.join(data_dir, 'cars.bin'))
-        self.contracts = Contracts(os.path.join(data_dir, 'contracts.bin'))
-
-    # lifecycle
+        self.customers = Customers(os.path.join(data_dir, 'customers.bin'), durability=durability)
+        self.cars      = Cars(     os.path.join(data_dir, 'cars.bin'),      durability=durability)
+        self.contracts = Contracts(os.path.join(data_dir, 'contracts.bin'), durability=durability)
+        # สถานะรายงานในรอบนี้ (เก็บในหน่วยความจำเท่านั้น ไม่เชื่อ report.txt ที่มีอยู่บนดิสก์)
+        self._dirty = True                       # มีการแก้ไขหลังรายงานล่าสุด / ยังไม่เคยสร้างรายงานในรอบนี้
+        self._last_report: Optional[str] = None  # path ของรายงานที่สร้างล่าสุดในรอบนี้
+
+    # lifecycle (close -> checkpoint ทุกตารางก่อนปิด)
     def open(self): self.customers.open(); self.cars.open(); self.contracts.open()
     def close(self): self.customers.close(); self.cars.close(); self.contracts.close()
+    def flush(self): self.customers.flush_header(); self.cars.flush_header(); self.contracts.flush_header()
 
     # ---------- Add ----------
     def add_customer(self):
@@ -292,7 +406,7 @@ class App:
             print('! ข้อมูลไม่ถูกต้อง'); return
         cid = self.customers.next_id()
         rec = self.customers.pack(1, cid, idc, name, phone, ymd_to_int(dob), gender)
-        self.customers.add_record(cid, rec); print(f'+ เพิ่มลูกค้า id={cid}')
+        self.customers.add_record(cid, rec); self._dirty = True; print(f'+ เพิ่มลูกค้า id={cid}')
 
     def add_car(self):
         plate = input('ทะเบียน (<=16): ').strip()
@@ -308,7 +422,7 @@ class App:
         if not is_plate(plate) or not is_year(year) or rate < 0 or odo < 0:
             print('! ข้อมูลไม่ถูกต้อง'); return
         car_id = self.cars.next_id(); rec = self.cars.pack(1, car_id, plate, brand, model, year, int(round(rate*100)), odo, stat, now_ts())
-        self.cars.add_record(car_id, rec); print(f'+ เพิ่มรถ id={car_id}')
+        self.cars.add_record(car_id, rec); self._dirty = True; print(f'+ เพิ่มรถ id={car_id}')
 
     def add_contract(self):
         try:
@@ -319,23 +433,25 @@ class App:
             rent = today.year*10000 + today.month*100 + today.day
         except Exception:
             print('! อินพุตไม่ถูกต้อง'); return
-        car_raw = self.cars.read_record(car_id)
-        if not car_raw: print('! ไม่พบรถ'); return
+        hit = self.cars.read_with_index(car_id)
+        if not hit: print('! ไม่พบรถ'); return
+        car_ri, car_raw = hit
         car = self.cars.unpack(car_raw)
         if car['status'] != 0: print('! รถไม่ว่าง'); return
         if not self.customers.read_record(cus_id): print('! ไม่พบลูกค้า'); return
         rid = self.contracts.next_id()
         self.contracts.add_record(rid, self.contracts.pack(1, rid, cus_id, car_id, rent, 0, 0, 0))
-        self.cars.update_record(car_id, self.cars.pack(1, car['car_id'], car['license'], car['brand'], car['model'], 
-                                                       car['year'], car['rate_cents'], car['odometer_km'], 1, now_ts()))
+        self.contracts.open_by_car[car_id] = rid
+        self.cars.update_status_at(car_ri, 1, now_ts()); self._dirty = True
         print(f'+ เปิดสัญญา rent_id={rid}')
 
     # ---------- Update ----------
     def update_customer(self):
         try: cid = int(input('cus_id: '))
         except Exception: print('! อินพุตไม่ถูกต้อง'); return
-        raw = self.customers.read_record(cid)
-        if not raw: print('! ไม่พบลูกค้า'); return
+        hit = self.customers.read_with_index(cid)
+        if not hit: print('! ไม่พบลูกค้า'); return
+        ri, raw = hit
         r = self.customers.unpack(raw)
         name = input(f"ชื่อ [{r['name']}]: ").strip() or r['name']
         idc  = input(f"บัตร13 [{r['id_card']}]: ").strip() or r['id_card']
@@ -344,15 +460,16 @@ class App:
         g    = input('เพศ (unk/male/female) [คงเดิม]: ').strip().lower()
         gender = {'unk':0,'male':1,'female':2}.get(g, r['gender'])
         if not name or not is_idcard(idc) or not is_phone(phone): print('! ข้อมูลไม่ถูกต้อง'); return
-        self.customers.update_record(cid, self.customers.pack(1, cid, idc, name, phone, (r['birth_ymd'] if not dob else ymd_to_int(dob)), gender))
-        print('* อัปเดตลูกค้าแล้ว')
+        self.customers.update_at(ri, self.customers.pack(1, cid, idc, name, phone, (r['birth_ymd'] if not dob else ymd_to_int(dob)), gender))
+        self._dirty = True; print('* อัปเดตลูกค้าแล้ว')
 
     def update_car(self):
         try: car_id = int(input('car_id: '))
         except Exception: print('! อินพุตไม่ถูกต้อง'); return
 
-        raw = self.cars.read_record(car_id)
-        if not raw: print('! ไม่พบรถ'); return
+        hit = self.cars.read_with_index(car_id)
+        if not hit: print('! ไม่พบรถ'); return
+        car_ri, raw = hit
         r = self.cars.unpack(raw)
 
         plate = input(f"ทะเบียน [{r['license']}]: ").strip() or r['license']
@@ -366,20 +483,19 @@ class App:
             print('! ตัวเลขไม่ถูกต้อง'); return
 
         stat  = CAR_STATUS_REV.get(
-            input(f"สถานะ ({'/'.join(CAR_STATUS.values())}) [{CAR_STATUS[r['status']]}]: ").strip() or CAR_STATUS[r['status']],
+            input(f"สถานะ ({'/'.join(CAR_STATUS)}) [{CAR_STATUS[r['status']]}]: ").strip() or CAR_STATUS[r['status']],
             r['status']
         )
 
         old_status = r['status']
         new_status = stat
 
-        # หา open contract ล่าสุดของรถคันนี้
-        open_latest = None
-        for _, rc in self.contracts.iter_active():
-            cc = self.contracts.unpack(rc)
-            if cc['car_id'] == car_id and cc['returned'] == 0:
-                if (open_latest is None) or (cc['rent_ymd'] > open_latest['rent_ymd']):
-                    open_latest = cc
+        # open contract ล่าสุดของรถคันนี้ (จาก index open_by_car)
+        open_ri = open_latest = None
+        open_rid = self.contracts.open_by_car.get(car_id)
+        hit = None if open_rid is None else self.contracts.read_with_index(open_rid)
+        if hit:
+            open_ri, open_latest = hit[0], self.contracts.unpack(hit[1])
 
         if open_latest:
             if new_status == 0 and old_status == 1:
@@ -389,13 +505,14 @@ class App:
                 def to_dt(n:int): return date(n//10000, (n//100)%100, n%100)
                 days = (to_dt(ret) - to_dt(open_latest['rent_ymd'])).days or 1
                 total = days * r['rate_cents']
-                self.contracts.update_record(
-                    open_latest['rent_id'],
+                self.contracts.update_at(
+                    open_ri,
                     self.contracts.pack(
                         1, open_latest['rent_id'], open_latest['cus_id'], open_latest['car_id'],
                         open_latest['rent_ymd'], ret, total, 1
                     )
                 )
+                self.contracts.open_by_car.pop(car_id, None); self._dirty = True
                 print(f"* ปิดสัญญาอัตโนมัติ rent_id={open_latest['rent_id']} ยอด {total/100:.2f} บาท ({days} วัน)")
             elif new_status != 1:
                 print('! รถคันนี้ยังมีสัญญาเช่าเปิดอยู่ ต้องคืนรถ (return_car) ก่อน หรือคงสถานะเป็น rented')
@@ -410,11 +527,11 @@ class App:
         if not is_plate(plate) or not is_year(year) or rateb < 0 or odo < 0:
             print('! ข้อมูลไม่ถูกต้อง'); return
 
-        self.cars.update_record(
-            car_id,
+        self.cars.update_at(
+            car_ri,
             self.cars.pack(1, car_id, plate, brand, model, year, int(round(rateb*100)), odo, new_status, now_ts())
         )
-        print('* อัปเดตรถแล้ว')
+        self._dirty = True; print('* อัปเดตรถแล้ว')
 
 
     def return_car(self):
@@ -429,9 +546,10 @@ class App:
         except Exception:
             print('! อินพุตไม่ถูกต้อง'); return
 
-        raw = self.contracts.read_record(rid)
-        if not raw:
+        hit = self.contracts.read_with_index(rid)
+        if not hit:
             print('! ไม่พบสัญญา'); return
+        rent_ri, raw = hit
         r = self.contracts.unpack(raw)
         if r['returned'] == 1:
             print('! ปิดสัญญาแล้ว'); return
@@ -439,9 +557,10 @@ class App:
             print('! วันที่ผิด'); return
 
         # อ่านข้อมูลรถจากสัญญา
-        car_raw = self.cars.read_record(r['car_id'])
-        if not car_raw:
+        car_hit = self.cars.read_with_index(r['car_id'])
+        if not car_hit:
             print('! ไม่พบรถในสัญญา'); return
+        car_ri, car_raw = car_hit
         car = self.cars.unpack(car_raw)
 
         # คำนวณจำนวนวัน (ขั้นต่ำ 1 วัน) และยอด
@@ -450,21 +569,19 @@ class App:
         total = days * car['rate_cents']
 
         # อัปเดตสัญญา -> ปิดสัญญา
-        self.contracts.update_record(
-            rid,
+        self.contracts.update_at(
+            rent_ri,
             self.contracts.pack(1, r['rent_id'], r['cus_id'], r['car_id'], r['rent_ymd'], ret, total, 1)
         )
+        if self.contracts.open_by_car.get(r['car_id']) == rid:
+            del self.contracts.open_by_car[r['car_id']]
 
         # อัปเดตรถ: ถ้าปัจจุบันเป็น rented(1) ให้กลับเป็น available(0) มิฉะนั้นคงสถานะเดิม
-        new_status = 0 if car['status'] == 1 else car['status']
-        self.cars.update_record(
-            car['car_id'],
-            self.cars.pack(
-                1, car['car_id'], car['license'], car['brand'], car['model'],
-                car['year'], car['rate_cents'], car['odometer_km'], new_status, now_ts()
-            )
-        )
+        self.cars.update_status_at(car_ri, 0 if car['status'] == 1 else car['status'], now_ts())
+        self._dirty = True
 
+        # ธุรกรรมเกี่ยวกับเงิน -> fsync ทันทีไม่รอ close
+        self.contracts.checkpoint(); self.cars.checkpoint()
         print(f"* ปิดสัญญาแล้ว ยอด {total/100:.2f} บาท ({days} วัน)")
 
 
@@ -472,7 +589,7 @@ class App:
     def delete_customer(self):
         try: cid = int(input('cus_id: '))
         except Exception: print('! อินพุตไม่ถูกต้อง'); return
-        try: self.customers.delete_record(cid); print('- ลบลูกค้าแล้ว')
+        try: self.customers.delete_record(cid); self._dirty = True; print('- ลบลูกค้าแล้ว')
         except Exception as e: print('!',e)
 
     def delete_car(self):
@@ -482,14 +599,14 @@ class App:
         if not raw: print('! ไม่พบรถ'); return
         if self.cars.unpack(raw)['status'] == 1:
             print('! รถกำลังเช่า ลบไม่ได้'); return
-        try: self.cars.delete_record(car_id); print('- ลบรถแล้ว')
+        try: self.cars.delete_record(car_id); self._dirty = True; print('- ลบรถแล้ว')
         except Exception as e: print('!',e)
         
 
     def delete_contract(self):
         try: rid = int(input('rent_id: '))
         except Exception: print('! อินพุตไม่ถูกต้อง'); return
-        try: self.contracts.delete_record(rid); print('- ลบสัญญาแล้ว')
+        try: self.contracts.delete_record(rid); self._dirty = True; print('- ลบสัญญาแล้ว')
         except Exception as e: print('!',e)
 
     # ---------- View ----------
@@ -527,20 +644,18 @@ class App:
             gender_map = {0: 'unk', 1: 'male', 2: 'female'}
             print(f"{'ID':>4} | {'Name':<24} | {'Phone':<10} | {'Birth':<10} | {'Gender'}")
             print('-' * 60)
-            for _, raw in self.customers.iter_active():
-                r = self.customers.unpack(raw)
-                gend = gender_map.get(r['gender'], 'unk')
-                print(f"{r['cus_id']:>4} | {r['name']:<24} | {r['phone']:<10} | "
-                    f"{int_to_ymd(r['birth_ymd']):<10} | {gend}")
+            for _, (_, cid, _, nam, ph, birth, gen) in self.customers.scan_active():
+                gend = gender_map.get(gen, 'unk')
+                print(f"{cid:>4} | {_dec(nam):<24} | {_dec(ph):<10} | "
+                    f"{int_to_ymd(birth):<10} | {gend}")
 
         elif t.startswith('car'):
             print(f"{'ID':>4} | {'Plate':<10} | {'Brand':<10} | {'Model':<10} | "
                 f"{'Year':>4} | {'Rate':>10} | {'Status':<10}")
             print('-' * 80)
-            for _, raw in self.cars.iter_active():
-                r = self.cars.unpack(raw)
-                print(f"{r['car_id']:>4} | {r['license']:<10} | {r['brand']:<10} | {r['model']:<10} | "
-                    f"{r['year']:>4} | {r['rate_cents']/100:>10.2f} | {CAR_STATUS[r['status']]:<10}")
+            for _, (_, car_id, pl, br, md, yr, rt, _, st, _) in self.cars.scan_active():
+                print(f"{car_id:>4} | {_dec(pl):<10} | {_dec(br):<10} | {_dec(md):<10} | "
+                    f"{yr:>4} | {rt/100:>10.2f} | {CAR_STATUS[st]:<10}")
 
         elif t.startswith('cont'):
             name_cache: Dict[int, str] = {}
@@ -548,22 +663,18 @@ class App:
             def customer_name(cus_id: int) -> str:
                 if cus_id in name_cache:
                     return name_cache[cus_id]
-                rawc = self.customers.read_record(cus_id)
-                if not rawc:
-                    name_cache[cus_id] = f"cus#{cus_id}"
-                else:
-                    name_cache[cus_id] = self.customers.unpack(rawc)['name']
+                name = self.customers.name_of(cus_id)
+                name_cache[cus_id] = f"cus#{cus_id}" if name is None else name
                 return name_cache[cus_id]
 
             print(f"{'Rent_ID':>7} | {'Cus_ID':>6} | {'Name':<24} | {'Car_ID':>6} | "
                 f"{'Rent_Time':<22} | {'Total':>10}")
             print('-' * 90)
-            for _, raw in self.contracts.iter_active():
-                r = self.contracts.unpack(raw)
-                cname = customer_name(r['cus_id'])
-                rent_time = f"{int_to_ymd(r['rent_ymd'])}->{int_to_ymd(r['return_ymd'])}"
-                print(f"{r['rent_id']:>7} | {r['cus_id']:>6} | {cname:<24} | {r['car_id']:>6} | "
-                    f"{rent_time:<22} | {r['total_cents']/100:>10.2f}")
+            for _, (_, rid, cus_id, car_id, rent, ret, tot, _) in self.contracts.scan_active():
+                cname = customer_name(cus_id)
+                rent_time = f"{int_to_ymd(rent)}->{int_to_ymd(ret)}"
+                print(f"{rid:>7} | {cus_id:>6} | {cname:<24} | {car_id:>6} | "
+                    f"{rent_time:<22} | {tot/100:>10.2f}")
 
         else:
             print("เขียนไม่ถูกต้อง")
@@ -575,10 +686,10 @@ class App:
             return
         if t.startswith('cust'):
             q = input('ค้นหาชื่อ: ').strip().lower()
-            for _, raw in self.customers.iter_active():
-                r = self.customers.unpack(raw)
-                if q in r['name'].lower():
-                    print(f"{r['cus_id']:>4} | {r['name']}")
+            for _, (_, cid, _, nam, _, _, _) in self.customers.scan_active():
+                name = _dec(nam)
+                if q in name.lower():
+                    print(f"{cid:>4} | {name}")
 
         elif t.startswith('car'):
             raw_in = input('สถานะ (available/rented/maintenance/retired หรือเว้นว่าง): ').strip().lower()
@@ -586,144 +697,136 @@ class App:
             if raw_in:
                 if raw_in.isdigit():
                     v = int(raw_in)
-                    if v in CAR_STATUS:
+                    if v < len(CAR_STATUS):
                         st_code = v
                 else:
-                    # ชื่อเต็มก่อน
-                    exact = [code for code, label in CAR_STATUS.items() if label == raw_in]
-                    if exact:
-                        st_code = exact[0]
-                    else:
-                        # prefix match (avai/ren/main/ret)
-                        matched = [code for code, label in CAR_STATUS.items() if label.startswith(raw_in)]
-                        if len(matched) == 1:
-                            st_code = matched[0]
-                        elif len(matched) > 1:
-                            print("คำค้นกำกวม: ", ', '.join(CAR_STATUS[m] for m in matched))
-                            return
-            for _, raw in self.cars.iter_active():
-                r = self.cars.unpack(raw)
-                if st_code is None or r['status'] == st_code:
-                    print(f"{r['car_id']:>4} | {r['license']:<10} | {r['brand']:<10} | {r['model']:<10} | "
-                        f"{r['year']} | {r['rate_cents']/100:<10.2f} | {CAR_STATUS[r['status']]:<10}")
+                    # ชื่อเต็มหรือ prefix (avai/ren/main/ret) — ชื่อเต็มไม่เป็น prefix ของสถานะอื่น
+                    matched = CAR_STATUS_PREFIX.get(raw_in, ())
+                    if len(matched) == 1:
+                        st_code = matched[0]
+                    elif len(matched) > 1:
+                        print("คำค้นกำกวม: ", ', '.join(CAR_STATUS[m] for m in matched))
+                        return
+            for _, (_, car_id, pl, br, md, yr, rt, _, st, _) in self.cars.scan_active():
+                if st_code is None or st == st_code:
+                    print(f"{car_id:>4} | {_dec(pl):<10} | {_dec(br):<10} | {_dec(md):<10} | "
+                        f"{yr} | {rt/100:<10.2f} | {CAR_STATUS[st]:<10}")
         elif t.startswith('cont'):
             try:
                 a_str, b_str = input('ช่วง FROM,TO (YYYY-MM-DD,YYYY-MM-DD): ').split(',')
                 a, b = ymd_to_int(a_str.strip()), ymd_to_int(b_str.strip())
             except Exception:
                 print('รูปแบบวันที่ไม่ถูกต้อง'); return
-            for _, raw in self.contracts.iter_active():
-                r = self.contracts.unpack(raw)
-                if a <= r['rent_ymd'] <= b:
-                    print(f"{r['rent_id']:>4} | {int_to_ymd(r['rent_ymd'])}")
+            for _, (_, rid, _, _, rent, _, _, _) in self.contracts.scan_active():
+                if a <= rent <= b:
+                    print(f"{rid:>4} | {int_to_ymd(rent)}")
         else:
             print("เขียนไม่ถูกต้อง")
 
 
     def view_stats(self):
-        cnt = {k:0 for k in CAR_STATUS}
-        for _,raw in self.cars.iter_active():
-            cnt[self.cars.unpack(raw)['status']] += 1
+        cnt = [0]*len(CAR_STATUS)
+        for _, t in self.cars.scan_active():
+            cnt[t[8]] += 1
         print('Cars by status:')
-        for k,v in cnt.items(): print(f"  {CAR_STATUS[k]} = {v}")
-        open_ct = sum(1 for _,raw in self.contracts.iter_active() if self.contracts.unpack(raw)['returned']==0)
-        print('Open contracts =', open_ct)
+        for k,v in enumerate(cnt): print(f"  {CAR_STATUS[k]} = {v}")
+        print('Open contracts =', len(self.contracts.open_by_car))
+
+    def report(self, out_path: str) -> None:
+        """สร้างรายงาน ยกเว้นเพิ่งสร้างไฟล์เดียวกันในรอบนี้และยังไม่มีการแก้ไขข้อมูล (เช่น กด 5 แล้ว 0)"""
+        if not self._dirty and self._last_report == out_path:
+            print('* รายงานเป็นปัจจุบันแล้ว:', out_path); return
+        self.generate_report(out_path)
 
     def generate_report(self, out_path: str):
         fmd = lambda n: '-' if not n else f"{(n//100)%100:02d}-{n%100:02d}"
         to_dt = lambda n: date(n//10000, (n//100)%100, n%100)
         days_between = lambda a,b: 0 if (not a or not b) else (to_dt(b) - to_dt(a)).days
 
-        name_cache, car_cache = {}, {}
+        name_cache = {}
 
         def customer_name(cus_id: int) -> str:
             if cus_id not in name_cache:
-                raw = self.customers.read_record(cus_id)
-                name_cache[cus_id] = f"cus#{cus_id}" if not raw else self.customers.unpack(raw)['name']
+                name = self.customers.name_of(cus_id)
+                name_cache[cus_id] = f"cus#{cus_id}" if name is None else name
             return name_cache[cus_id]
 
-        def car_info(car_id: int) -> dict:
-            if car_id not in car_cache:
-                raw = self.cars.read_record(car_id)
-                car_cache[car_id] = {'license': f'car#{car_id}', 'brand': 'Unknown', 'model': 'Unknown', 'rate_cents': 0} \
-                                    if not raw else self.cars.unpack(raw)
-            return car_cache[car_id]
+        # --- สแกนรถรอบเดียว: ได้ทั้งข้อมูลรถ (Active) สำหรับรายการเช่า และตัวนับสรุปรถ ---
+        car_by_id: Dict[int, tuple] = {}     # car_id -> (plate, brand, model, rate_cents)
+        total = active = rented = avail = 0; brands = []
+        for _, (flag, car_id, pl, br, md, _, rt, _, st, _) in self.cars.scan_all():
+            total += 1
+            if flag == 1:
+                active += 1
+                brand = _dec(br); brands.append(brand)
+                car_by_id[car_id] = (_dec(pl), brand, _dec(md), rt)
+                if st == 1: rented += 1
+                elif st == 0: avail += 1
+        by_brand = Counter(); by_brand.update(brands)
 
         # --- header รายงาน ---
-        lines = []
+        out = io.StringIO(); w = out.write      # เขียนต่อท้ายทีละบรรทัด ไม่ต้องเก็บ list แล้ว join
         ts = datetime.now().astimezone().strftime('%Y-%m-%d %H:%M:%S (%z)')
-        lines += [
-            'Car Rent System — Rental Report',
-            f'Generated At : {ts}',
-            '',
-            'รายการรถที่มีคนเช่า (ทั้งที่คืนแล้วและยังไม่คืน)',
-            ''
-        ]
+        w('Car Rent System — Rental Report\n'
+          f'Generated At : {ts}\n'
+          '\n'
+          'รายการรถที่มีคนเช่า (ทั้งที่คืนแล้วและยังไม่คืน)\n'
+          '\n')
 
         # --- ส่วนรายการเช่า (ทั้งคืนแล้ว/ยังเช่าอยู่) ---
-        rentals = [c for _, raw in self.contracts.iter_active()
-                for c in [self.contracts.unpack(raw)] if c['rent_ymd'] > 0]
+        # tuple: (flag, rent_id, cus_id, car_id, rent_ymd, return_ymd, total_cents, returned)
+        rentals = [t for _, t in self.contracts.scan_active() if t[4] > 0]
 
         if not rentals:
-            lines.append('ไม่มีรายการเช่า')
+            w('ไม่มีรายการเช่า\n')
         else:
-            rentals.sort(key=lambda x: x['rent_ymd'])
-            lines.append(f"{'Renter':<20} | {'Plate':<10} | {'Brand':<10} | {'Model':<12} | "
-                        f"{'Rate':>8} | {'Rent Time':<13} | {'Days':>4} | {'Amount':>10} | {'Status':<8}")
-            lines.append('-' * 120)
+            rentals.sort(key=lambda x: x[4])
+            w(f"{'Renter':<20} | {'Plate':<10} | {'Brand':<10} | {'Model':<12} | "
+              f"{'Rate':>8} | {'Rent Time':<13} | {'Days':>4} | {'Amount':>10} | {'Status':<8}\n")
+            w('-' * 120 + '\n')
 
             total_amount = 0.0
             today = datetime.now(); today_ymd = today.year*10000 + today.month*100 + today.day
 
-            for r in rentals:
-                c = car_info(r['car_id']); cname = customer_name(r['cus_id'])
-                start = fmd(r['rent_ymd'])
-                if r['returned'] == 1 and r['return_ymd'] > 0:
-                    end = fmd(r['return_ymd']); rent_time = f"{start}->{end}"
-                    days = days_between(r['rent_ymd'], r['return_ymd']) or 1
-                    amount = r['total_cents'] / 100; status = "คืนแล้ว"
+            for _, _, cus_id, car_id, rent, ret, tot, returned in rentals:
+                car = car_by_id.get(car_id)
+                plate, brand, model, rate = car if car else (f'car#{car_id}', 'Unknown', 'Unknown', 0)
+                cname = customer_name(cus_id)
+                start = fmd(rent)
+                if returned == 1 and ret > 0:
+                    end = fmd(ret); rent_time = f"{start}->{end}"
+                    days = days_between(rent, ret) or 1
+                    amount = tot / 100; status = "คืนแล้ว"
                 else:
                     end = fmd(today_ymd); rent_time = f"{start}->{end}"
-                    days = days_between(r['rent_ymd'], today_ymd) or 1
-                    amount = (days * c['rate_cents']) / 100; status = "เช่าอยู่"
+                    days = days_between(rent, today_ymd) or 1
+                    amount = (days * rate) / 100; status = "เช่าอยู่"
 
                 total_amount += amount
-                lines.append(f"{cname:<20.20} | {c['license']:<10.10} | {c['brand']:<10.10} | "
-                            f"{c['model']:<12.12} | {c['rate_cents']/100:>8.0f} | {rent_time:<13} | "
-                            f"{days:>4} | {amount:>10.2f} | {status:<8}")
+                w(f"{cname:<20.20} | {plate:<10.10} | {brand:<10.10} | "
+                  f"{model:<12.12} | {rate/100:>8.0f} | {rent_time:<13} | "
+                  f"{days:>4} | {amount:>10.2f} | {status:<8}\n")
 
-            lines += ['', f'สรุป: {len(rentals)} รายการ', f'รวมยอดเงิน: {total_amount:,.2f} บาท']
+            w(f'\nสรุป: {len(rentals)} รายการ\nรวมยอดเงิน: {total_amount:,.2f} บาท\n')
 
         # --- สรุปภาพรวมรถ (Active เท่านั้น) ---
-        lines += ['', 'Summary (นับเฉพาะสถานะ Active)']
-        total = active = rented = avail = 0; by_brand = {}
-
-        for _, raw in self.cars.iter_all():
-            total += 1
-            c = self.cars.unpack(raw); is_active = (raw[0] == 1)
-            if is_active:
-                active += 1
-                by_brand[c['brand']] = by_brand.get(c['brand'], 0) + 1
-                if c['status'] == 1: rented += 1
-                elif c['status'] == 0: avail += 1
-
         deleted = total - active
-        lines += [
-            f'- Total Cars (records) : {total}',
-            f'- Active Cars          : {active}',
-            f'- Deleted Cars         : {deleted}',
-            f'- Currently Rented     : {rented}',
-            f'- Available Now        : {avail}'
-        ]
-
-        lines += ['', 'Cars by Brand (Active only)']
+        w('\nSummary (นับเฉพาะสถานะ Active)\n'
+          f'- Total Cars (records) : {total}\n'
+          f'- Active Cars          : {active}\n'
+          f'- Deleted Cars         : {deleted}\n'
+          f'- Currently Rented     : {rented}\n'
+          f'- Available Now        : {avail}\n')
+
+        w('\nCars by Brand (Active only)\n')
         if by_brand:
-            for b in sorted(by_brand): lines.append(f'- {b} : {by_brand[b]}')
+            for b in sorted(by_brand): w(f'- {b} : {by_brand[b]}\n')
         else:
-            lines.append('(no active cars)')
+            w('(no active cars)\n')
 
         with open(out_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines) + '\n')
+            f.write(out.getvalue())
+        self._dirty = False; self._last_report = out_path
         print('* เขียนรายงานที่', out_path)
 
 
@@ -742,6 +845,7 @@ class App:
                         {'1': self.add_customer,
                         '2': self.add_car,
                         '3': self.add_contract}.get(ch, lambda: print('ตัวเลือกไม่ถูกต้อง'))()
+                        self.flush()
                 elif c == '2':
                     # --- Update submenu ---
                     while True:
@@ -751,6 +855,7 @@ class App:
                         {'1': self.update_customer,
                         '2': self.update_car,
                         '3': self.return_car}.get(ch, lambda: print('ตัวเลือกไม่ถูกต้อง'))()
+                        self.flush()
                 elif c == '3':
                     # --- Delete submenu ---
                     while True:
@@ -760,6 +865,7 @@ class App:
                         {'1': self.delete_customer,
                         '2': self.delete_car,
                         '3': self.delete_contract}.get(ch, lambda: print('ตัวเลือกไม่ถูกต้อง'))()
+                        self.flush()
                 elif c == '4':
                     while True:
                         print("\n[View] 1) เดี่ยว 2) ทั้งหมด 3) กรอง 4) สถิติ  0) Back")
@@ -771,11 +877,11 @@ class App:
                         '4': self.view_stats}.get(ch, lambda: print('ตัวเลือกไม่ถูกต้อง'))()
                 elif c == '5':
                     out = os.path.join(os.path.dirname(self.customers.path), 'report.txt')
-                    self.generate_report(out)
+                    self.report(out)
 
                 elif c == '0':
                     out = os.path.join(os.path.dirname(self.customers.path), 'report.txt')
-                    self.generate_report(out)
+                    self.report(out)
                     print('บันทึกและออก...')
                     self.close()
                     break
@@ -792,9 +898,11 @@ class App:
 def main(argv=None) -> int:
     ap=argparse.ArgumentParser(description='CarRent-BinIO (clean)')
     ap.add_argument('--data-dir', default='data', help='โฟลเดอร์เก็บ .bin/.txt')
+    ap.add_argument('--durability', choices=DURABILITY, default='batch',
+                    help='นโยบาย fsync: none / batch (ตอน checkpoint/close) / full (ทุกครั้งที่แก้ไข)')
     args=ap.parse_args(argv)
     ensure_dir(args.data_dir)
-    app=App(args.data_dir)
+    app=App(args.data_dir, args.durability)
     try:
         app.open(); app.run(); return 0
     finally:
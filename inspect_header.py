@@ -19,12 +19,15 @@ inspect_header.py — ตัวตรวจ/อ่าน Header ของไฟ
 """
 from __future__ import annotations
 import argparse, os, sys, json, struct
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Tuple, Dict
 
 # รูปแบบ Header (ความยาวคงที่ 128 ไบต์)
 BASE_FMT = '4s B B H I I I I I i I 92x'  # ไม่ใส่ endianness ที่นี่ จะเติมทีหลัง
+HEADER_STRUCT_LE = struct.Struct('<' + BASE_FMT)
+HEADER_STRUCT_BE = struct.Struct('>' + BASE_FMT)
+OFF_ENDIAN = 5   # ไบต์ endianness (หลัง magic 4s + version B) อ่านได้โดยไม่ขึ้นกับ endian
 HEADER_SIZE = 128
 INDEX_SLOT_SIZE = 16
 
@@ -47,14 +50,17 @@ class Header:
 
     @classmethod
     def unpack(cls, raw: bytes, endian_prefix: str) -> 'Header':
-        vals = struct.unpack(endian_prefix + BASE_FMT, raw)
+        vals = (HEADER_STRUCT_BE if endian_prefix == '>' else HEADER_STRUCT_LE).unpack(raw)
         # หมายเหตุ: padding ("92x") ไม่ถูกคืนค่าจาก struct.unpack อยู่แล้ว
         # ดังนั้นไม่ต้องตัดค่าใด ๆ ออก ให้ส่งทั้งหมดเข้า __init__ ตรง ๆ
         return cls(*vals)
 
     def to_dict(self) -> Dict:
-        d = asdict(self)
-        d['magic'] = self.magic.decode('ascii', 'ignore')
+        # สร้าง dict ตรง ๆ (asdict จะ deepcopy ทุกฟิลด์โดยไม่จำเป็น — ทุกฟิลด์เป็น scalar)
+        d = {'magic': self.magic.decode('ascii', 'ignore'), 'version': self.version, 'endian': self.endian,
+             'record_size': self.record_size, 'created_at': self.created_at, 'updated_at': self.updated_at,
+             'next_id': self.next_id, 'active_count': self.active_count, 'deleted_count': self.deleted_count,
+             'free_head': self.free_head, 'index_slots': self.index_slots}
         d['endianness_str'] = ENDIAN_NAME.get(self.endian, f'unknown({self.endian})')
         d['created_at_str'] = datetime.fromtimestamp(self.created_at).isoformat(sep=' ', timespec='seconds')
         d['updated_at_str'] = datetime.fromtimestamp(self.updated_at).isoformat(sep=' ', timespec='seconds')
@@ -68,13 +74,9 @@ def read_header(path: str) -> Tuple[Header, int, int]:
         raw = f.read(HEADER_SIZE)
         if len(raw) != HEADER_SIZE:
             raise RuntimeError('ไฟล์สั้นเกินไป ไม่พบ Header ครบ 128 ไบต์')
-        # ลองถอดแบบ LE ก่อน (ตามสเปกของระบบ)
-        h = Header.unpack(raw, '<')
-        if h.endian == 1:
-            # ถ้าเขียนแบบ Big-Endian มา ให้ถอดใหม่อีกครั้ง
-            h = Header.unpack(raw, '>')
-        f.seek(0, os.SEEK_END)
-        size = f.tell()
+        # ดูไบต์ endian ก่อน แล้วถอดครั้งเดียวด้วย Struct ที่ตรงกัน (ค่าเริ่มต้น LE ตามสเปกของระบบ)
+        h = Header.unpack(raw, '>' if raw[OFF_ENDIAN] == 1 else '<')
+        size = os.fstat(f.fileno()).st_size   # ขนาดไฟล์จาก fstat (ไม่ต้อง seek ไปท้ายไฟล์)
     # คำนวณจำนวนเรคคอร์ดจากขนาดไฟล์จริง
     records_region = HEADER_SIZE + h.index_slots * INDEX_SLOT_SIZE
     total_records = (size - records_region) // h.record_size if size >= records_region else 0